@@ -1,7 +1,27 @@
-from ctypes import c_ulong, create_string_buffer, POINTER, windll, wintypes
+from collections import namedtuple
+from ctypes import (byref, c_size_t, c_ulong, c_void_p, create_string_buffer,
+                    create_unicode_buffer, sizeof, POINTER, Structure, windll,
+                    wintypes)
+import os.path
 import struct
 
 
+class _MEMORY_BASIC_INFORMATION(Structure):
+    _fields_ = (('BaseAddress', c_void_p),
+                ('AllocationBase', c_void_p),
+                ('AllocationProtect', wintypes.DWORD),
+                ('RegionSize', c_size_t),
+                ('State', wintypes.DWORD),
+                ('Protect', wintypes.DWORD),
+                ('Type', wintypes.DWORD))
+
+
+class _MODULEINFO(Structure):
+    _fields_ = (('lpBaseOfDll', c_void_p),
+                ('SizeOfImage', wintypes.DWORD),
+                ('EntryPoint', c_void_p))
+
+
 _OpenProcess = windll.kernel32.OpenProcess
 _OpenProcess.argtypes = (wintypes.DWORD, wintypes.BOOL, wintypes.DWORD)
 _OpenProcess.restype = wintypes.HANDLE
@@ -20,6 +40,27 @@ _CloseHandle = windll.kernel32.CloseHandle
 _CloseHandle.argtypes = (wintypes.HANDLE,)
 _CloseHandle.restype = wintypes.BOOL
 
+_VirtualQueryEx = windll.kernel32.VirtualQueryEx
+_VirtualQueryEx.argtypes = (wintypes.HANDLE, wintypes.LPCVOID,
+                            POINTER(_MEMORY_BASIC_INFORMATION), c_size_t)
+_VirtualQueryEx.restype = c_size_t
+
+_EnumProcessModulesEx = windll.psapi.EnumProcessModulesEx
+_EnumProcessModulesEx.argtypes = (wintypes.HANDLE, POINTER(wintypes.HMODULE),
+                                  wintypes.DWORD, POINTER(wintypes.DWORD),
+                                  wintypes.DWORD)
+_EnumProcessModulesEx.restype = wintypes.BOOL
+
+_GetModuleFileNameExW = windll.psapi.GetModuleFileNameExW
+_GetModuleFileNameExW.argtypes = (wintypes.HANDLE, wintypes.HMODULE,
+                                  wintypes.LPWSTR, wintypes.DWORD)
+_GetModuleFileNameExW.restype = wintypes.DWORD
+
+_GetModuleInformation = windll.psapi.GetModuleInformation
+_GetModuleInformation.argtypes = (wintypes.HANDLE, wintypes.HMODULE,
+                                  POINTER(_MODULEINFO), wintypes.DWORD)
+_GetModuleInformation.restype = wintypes.BOOL
+
 _GetLastError = windll.kernel32.GetLastError
 _GetLastError.argtypes = tuple()
 _GetLastError.restype = wintypes.DWORD
@@ -27,6 +68,20 @@ _GetLastError.restype = wintypes.DWORD
 _PROCESS_VM_OPERATION = 0x0008
 _PROCESS_VM_READ = 0x0010
 _PROCESS_VM_WRITE = 0x0020
+_PROCESS_QUERY_INFORMATION = 0x0400
+
+_ERROR_INVALID_PARAMETER = 87
+
+_MEM_COMMIT = 0x1000
+_PAGE_NOACCESS = 0x01
+_PAGE_GUARD = 0x100
+
+_LIST_MODULES_ALL = 0x03
+_MAX_PATH_LENGTH = 32767
+
+
+MemoryRegion = namedtuple('MemoryRegion', ('address', 'size', 'protect'))
+Module = namedtuple('Module', ('name', 'path', 'address', 'size'))
 
 
 class MemoryView:
@@ -72,6 +127,8 @@ class MemoryView:
             else:
                 raise ValueError('Invalid access mode: {}'.format(mode))
 
+        self._pid = pid
+        self._query_handle = None
         self._process_handle = _OpenProcess(access_level, False, pid)
 
         if self._process_handle is None:
@@ -87,8 +144,18 @@ class MemoryView:
         Calling this function on an already closed `MemoryView` raises an
         exception.
         """
-        if not _CloseHandle(self._process_handle):
-            error_code = _GetLastError()
+        handles = [self._process_handle]
+        if self._query_handle is not None:
+            handles.append(self._query_handle)
+            self._query_handle = None
+
+        # Close all handles before reporting the first error, so none leaks.
+        error_code = None
+        for handle in handles:
+            if not _CloseHandle(handle) and error_code is None:
+                error_code = _GetLastError()
+
+        if error_code is not None:
             raise RuntimeError(
                 "Can't close process handle, "
                 "error code {}".format(error_code))
@@ -120,6 +187,122 @@ class MemoryView:
 
         return buffer.raw
 
+    def _get_query_handle(self):
+        # Enumerating regions and modules needs query access, which isn't
+        # granted for every process that allows reading memory. So the handle
+        # is only requested once it's needed.
+        if self._query_handle is None:
+            query_handle = _OpenProcess(
+                _PROCESS_QUERY_INFORMATION + _PROCESS_VM_READ, False,
+                self._pid)
+            if query_handle is None:
+                error_code = _GetLastError()
+                raise RuntimeError(
+                    "Can't query process with pid {}, "
+                    "error code {}".format(self._pid, error_code))
+            self._query_handle = query_handle
+
+        return self._query_handle
+
+    def regions(self, start=0, stop=None):
+        """
+        Enumerates the readable memory regions of the process.
+
+        Only committed regions are yielded, regions marked as inaccessible or
+        as guard pages are skipped. Enumerating regions requires query access
+        to the process, which is requested on first use.
+
+        >>> with MemoryView(5555) as view:
+        >>>     for region in view.regions():
+        >>>         data = view.read(region.size, region.address)
+
+        :param start:
+            Memory address where to start enumerating.
+        :param stop:
+            Memory address where to stop enumerating. Regions crossing
+            `start` or `stop` are clipped. `None` enumerates until the end of
+            the address space.
+        :return:
+            An iterator of `MemoryRegion` objects.
+        """
+        query_handle = self._get_query_handle()
+        info = _MEMORY_BASIC_INFORMATION()
+        address = start
+
+        while stop is None or address < stop:
+            if not _VirtualQueryEx(query_handle, address, byref(info),
+                                   sizeof(info)):
+                error_code = _GetLastError()
+                if error_code == _ERROR_INVALID_PARAMETER:
+                    # End of the address space reached.
+                    break
+                raise RuntimeError(
+                    "Can't query memory region at address 0x{:x}, "
+                    "error code {}".format(address, error_code))
+
+            base = info.BaseAddress or 0
+            end = base + info.RegionSize
+            if end <= address:
+                break
+
+            if (info.State == _MEM_COMMIT and
+                    not info.Protect & (_PAGE_NOACCESS | _PAGE_GUARD)):
+                region_start = max(base, address)
+                region_end = end if stop is None else min(end, stop)
+                yield MemoryRegion(address=region_start,
+                                   size=region_end - region_start,
+                                   protect=info.Protect)
+
+            address = end
+
+    def modules(self):
+        """
+        Enumerates the modules (executable and DLLs) loaded by the process.
+
+        Enumerating modules requires query access to the process, which is
+        requested on first use.
+
+        :return:
+            A list of `Module` objects.
+        """
+        query_handle = self._get_query_handle()
+        count = 256
+        while True:
+            handles = (wintypes.HMODULE * count)()
+            needed = wintypes.DWORD()
+            if not _EnumProcessModulesEx(query_handle, handles,
+                                         sizeof(handles), needed,
+                                         _LIST_MODULES_ALL):
+                error_code = _GetLastError()
+                raise RuntimeError(
+                    "Can't enumerate process modules, "
+                    "error code {}".format(error_code))
+
+            if needed.value <= sizeof(handles):
+                break
+            count = needed.value // sizeof(wintypes.HMODULE)
+
+        modules = []
+        path_buffer = create_unicode_buffer(_MAX_PATH_LENGTH)
+        for handle in handles[:needed.value // sizeof(wintypes.HMODULE)]:
+            info = _MODULEINFO()
+            if (not _GetModuleFileNameExW(query_handle, handle,
+                                          path_buffer, len(path_buffer)) or
+                    not _GetModuleInformation(query_handle, handle,
+                                              byref(info), sizeof(info))):
+                error_code = _GetLastError()
+                raise RuntimeError(
+                    "Can't query process module information, "
+                    "error code {}".format(error_code))
+
+            path = path_buffer.value
+            modules.append(Module(name=os.path.basename(path),
+                                  path=path,
+                                  address=info.lpBaseOfDll or 0,
+                                  size=info.SizeOfImage))
+
+        return modules
+
     def _read_and_convert(self, fmt, address):
         return struct.unpack(fmt, self.read(struct.calcsize(fmt), address))
 
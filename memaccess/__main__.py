@@ -0,0 +1,401 @@
+from argparse import ArgumentParser, ArgumentTypeError
+from array import array
+from binascii import hexlify
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import errno
+import json
+import os
+import struct
+import sys
+from threading import Lock
+import time
+
+from memaccess import MemoryView
+from memaccess.signature import merge_regions, Signature
+
+
+_CHUNK_SIZE = 1024 * 1024
+
+_TYPES = {
+    'char': '<b',
+    'short': '<h',
+    'unsigned_short': '<H',
+    'int': '<i',
+    'unsigned_int': '<I',
+    'float': '<f',
+    'double': '<d',
+}
+
+
+# Wraps a `MemoryView` and counts `read` calls (each one `ReadProcessMemory`
+# call), so a run can report its statistics. Reads may happen from multiple
+# threads.
+class _StatisticsView:
+    def __init__(self, view):
+        self._view = view
+        self._lock = Lock()
+        self._start_time = time.perf_counter()
+        self.bytes_read = 0
+        self.reads = 0
+        self.errors = 0
+
+    def read(self, size, address):
+        try:
+            data = self._view.read(size, address)
+        except RuntimeError:
+            with self._lock:
+                self.reads += 1
+                self.errors += 1
+            raise
+
+        with self._lock:
+            self.reads += 1
+            self.bytes_read += size
+        return data
+
+    def regions(self, start=0, stop=None):
+        return self._view.regions(start, stop)
+
+    def summary(self):
+        seconds = time.perf_counter() - self._start_time
+        return {
+            'bytes_read': self.bytes_read,
+            'reads': self.reads,
+            'errors': self.errors,
+            'seconds': round(seconds, 6),
+            'throughput': round(self.bytes_read / seconds) if seconds else 0,
+        }
+
+
+def _parse_address(text):
+    return int(text, 0)
+
+
+def _parse_positive_int(text):
+    try:
+        value = int(text, 0)
+    except ValueError:
+        raise ArgumentTypeError('invalid integer: {}'.format(text))
+    if value <= 0:
+        raise ArgumentTypeError('must be positive: {}'.format(text))
+    return value
+
+
+def _parse_value(text, type_name):
+    if type_name in ('float', 'double'):
+        return float(text)
+    return int(text, 0)
+
+
+def _hex(data):
+    return hexlify(data).decode('ascii')
+
+
+def _write_record(record):
+    sys.stdout.write(json.dumps(record, separators=(',', ':')) + '\n')
+
+
+def _chunks(regions, chunk_size, overlap=0):
+    # Splits regions into chunks of `chunk_size` bytes, each extended by
+    # `overlap` bytes as far as the region reaches.
+    for region in regions:
+        for offset in range(0, region.size, chunk_size):
+            yield (region.address + offset,
+                   min(chunk_size + overlap, region.size - offset))
+
+
+def _ordered_map(function, iterable, workers):
+    # Like `map`, but evaluates `function` on up to `workers` threads. Only a
+    # bounded number of results is kept in flight, so memory stays bounded
+    # regardless of the size of `iterable`.
+    if workers <= 1:
+        for item in iterable:
+            yield function(item)
+        return
+
+    with ThreadPoolExecutor(workers) as executor:
+        pending = deque()
+        for item in iterable:
+            pending.append(executor.submit(function, item))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _read_chunk(view, chunk):
+    # Returns the chunk together with its data, or with the error message if
+    # it can't be read.
+    address, size = chunk
+    try:
+        return address, size, view.read(size, address), None
+    except RuntimeError as ex:
+        return address, size, None, str(ex)
+
+
+def _write_zeros(size, chunk_size):
+    while size > 0:
+        zeros_size = min(size, chunk_size)
+        sys.stdout.buffer.write(bytes(zeros_size))
+        size -= zeros_size
+
+
+def _command_regions(view, args):
+    for region in view.regions(args.start, args.stop):
+        _write_record({'address': region.address,
+                       'size': region.size,
+                       'protect': region.protect})
+
+
+def _command_dump(view, args):
+    chunks = _chunks(view.regions(args.start, args.stop), args.chunk_size)
+    position = args.start
+    for address, size, data, error in _ordered_map(
+            lambda chunk: _read_chunk(view, chunk), chunks, args.workers):
+        if args.format == 'raw':
+            # Unreadable memory is filled with zeros, so offsets in the
+            # output map to addresses.
+            _write_zeros(address - position, args.chunk_size)
+            if data is None:
+                _write_zeros(size, args.chunk_size)
+            else:
+                sys.stdout.buffer.write(data)
+            position = address + size
+        elif data is None:
+            _write_record({'address': address, 'size': size, 'error': error})
+        else:
+            _write_record({'address': address, 'data': _hex(data)})
+
+    if args.format == 'raw':
+        _write_zeros(args.stop - position, args.chunk_size)
+
+
+def _command_search(view, args):
+    signature = args.signature
+
+    def search_chunk(chunk):
+        address, size, data, error = _read_chunk(view, chunk)
+        if data is None:
+            return address, size, None, error
+
+        matches = signature.finditer(data, args.chunk_size)
+        if args.workers > 1:
+            # Results of multiple chunks are kept in flight, so their offsets
+            # are stored compactly. Otherwise matches are written while
+            # searching.
+            matches = array('Q', matches)
+        return address, size, matches, None
+
+    # Adjacent regions are merged, so matches crossing region borders are
+    # found as well.
+    chunks = _chunks(merge_regions(view.regions(args.start, args.stop)),
+                     args.chunk_size, signature.size - 1)
+    for address, size, matches, error in _ordered_map(search_chunk, chunks,
+                                                      args.workers):
+        if matches is None:
+            _write_record({'address': address, 'size': size, 'error': error})
+            continue
+
+        for match in matches:
+            _write_record({'address': address + match})
+
+
+def _command_watch(view, args):
+    fmt = _TYPES[args.type]
+    size = struct.calcsize(fmt)
+
+    sample = 0
+    next_time = time.perf_counter()
+    while args.count is None or sample < args.count:
+        timestamp = time.time()
+        for address in args.addresses:
+            try:
+                value = struct.unpack(fmt, view.read(size, address))[0]
+            except RuntimeError as ex:
+                _write_record({'time': timestamp, 'address': address,
+                               'error': str(ex)})
+            else:
+                _write_record({'time': timestamp, 'address': address,
+                               'value': value})
+        sys.stdout.flush()
+
+        sample += 1
+        next_time += args.interval
+        time.sleep(max(0, next_time - time.perf_counter()))
+
+
+def _command_read(view, args):
+    if args.type is None:
+        data = view.read(args.size, args.address)
+        if args.format == 'raw':
+            sys.stdout.buffer.write(data)
+        else:
+            _write_record({'address': args.address, 'data': _hex(data)})
+        return
+
+    fmt = _TYPES[args.type]
+    size = struct.calcsize(fmt)
+    # Read all values at once instead of one read per value.
+    data = view.read(size * args.count, args.address)
+    if args.format == 'raw':
+        sys.stdout.buffer.write(data)
+        return
+
+    for index, (value,) in enumerate(struct.iter_unpack(fmt, data)):
+        _write_record({'address': args.address + index * size,
+                       'value': value})
+
+
+def _create_parser():
+    parser = ArgumentParser(
+        prog='memaccess',
+        description="Inspect a running program's memory. Records are "
+                    'streamed as NDJSON to stdout.')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    common = ArgumentParser(add_help=False)
+    common.add_argument('pid', type=int,
+                        help='Process-id of the process to observe.')
+    common.add_argument('--stats', action='store_true',
+                        help='Print a summary of bytes read, number of reads '
+                             'and throughput to stderr when finished.')
+
+    ranged = ArgumentParser(add_help=False)
+    ranged.add_argument('--start', type=_parse_address, default=0,
+                        help='Memory address where to start.')
+    ranged.add_argument('--stop', type=_parse_address,
+                        help='Memory address where to stop.')
+
+    bulk = ArgumentParser(add_help=False)
+    bulk.add_argument('--chunk-size', type=_parse_positive_int,
+                      default=_CHUNK_SIZE,
+                      help='Number of bytes to read at once.')
+    bulk.add_argument('--workers', type=_parse_positive_int, default=1,
+                      help='Number of threads reading chunks in parallel.')
+
+    regions_parser = subparsers.add_parser(
+        'regions', parents=(common, ranged),
+        help='List readable memory regions.')
+    regions_parser.set_defaults(function=_command_regions)
+
+    dump_parser = subparsers.add_parser(
+        'dump', parents=(common, ranged, bulk),
+        help='Dump readable memory.')
+    dump_parser.add_argument('--format', choices=('ndjson', 'raw'),
+                             default='ndjson',
+                             help='Output format. `raw` writes the memory '
+                                  'image from --start to --stop, where '
+                                  'unreadable memory is filled with zeros. '
+                                  'It requires --stop.')
+    dump_parser.set_defaults(function=_command_dump)
+
+    search_parser = subparsers.add_parser(
+        'search', parents=(common, ranged, bulk),
+        help='Search memory for bytes or a value.')
+    search_group = search_parser.add_mutually_exclusive_group(required=True)
+    search_group.add_argument('--pattern',
+                              help='Byte signature to search for, e.g. '
+                                   '"48 8B 05 ?? ?? ?? ??".')
+    search_group.add_argument('--value',
+                              help='Value to search for, see --type.')
+    search_parser.add_argument('--type', choices=sorted(_TYPES),
+                               default='int',
+                               help='Type of --value.')
+    search_parser.set_defaults(function=_command_search)
+
+    watch_parser = subparsers.add_parser(
+        'watch', parents=(common,),
+        help='Sample values at a fixed rate.')
+    watch_parser.add_argument('addresses', type=_parse_address, nargs='+',
+                              metavar='address',
+                              help='Memory addresses to sample.')
+    watch_parser.add_argument('--type', choices=sorted(_TYPES),
+                              default='int',
+                              help='Type of the values.')
+    watch_parser.add_argument('--interval', type=float, default=1.0,
+                              help='Seconds between two samples.')
+    watch_parser.add_argument('--count', type=_parse_positive_int,
+                              help='Number of samples to take. Samples '
+                                   'until interrupted by default.')
+    watch_parser.set_defaults(function=_command_watch)
+
+    read_parser = subparsers.add_parser(
+        'read', parents=(common,),
+        help='Read bytes or typed values.')
+    read_parser.add_argument('address', type=_parse_address,
+                             help='Memory address where to start reading.')
+    read_group = read_parser.add_mutually_exclusive_group(required=True)
+    read_group.add_argument('--type', choices=sorted(_TYPES),
+                            help='Type of the values to read.')
+    read_group.add_argument('--size', type=_parse_positive_int,
+                            help='Number of bytes to read.')
+    read_parser.add_argument('--count', type=_parse_positive_int, default=1,
+                             help='Number of consecutive values to read.')
+    read_parser.add_argument('--format', choices=('ndjson', 'raw'),
+                             default='ndjson',
+                             help='Output format.')
+    read_parser.set_defaults(function=_command_read)
+
+    return parser
+
+
+def _check_arguments(parser, args):
+    # Validates arguments depending on each other, before the process is
+    # opened.
+    if args.function is _command_search:
+        try:
+            if args.pattern is not None:
+                args.signature = Signature(args.pattern)
+            else:
+                args.signature = Signature.from_bytes(struct.pack(
+                    _TYPES[args.type], _parse_value(args.value, args.type)))
+        except (ValueError, struct.error) as ex:
+            parser.error(str(ex))
+
+    if (args.function is _command_dump and args.format == 'raw' and
+            args.stop is None):
+        parser.error('--format raw requires --stop')
+
+
+def main(argv=None):
+    """
+    Runs the `memaccess` command-line tool.
+
+    :param argv:
+        The command-line arguments. `None` uses `sys.argv`.
+    """
+    parser = _create_parser()
+    args = parser.parse_args(argv)
+    _check_arguments(parser, args)
+
+    try:
+        with MemoryView(args.pid) as view:
+            statistics_view = _StatisticsView(view)
+            try:
+                args.function(statistics_view, args)
+                sys.stdout.flush()
+            finally:
+                if args.stats:
+                    sys.stderr.write(json.dumps(statistics_view.summary()) +
+                                     '\n')
+    except (RuntimeError, ValueError) as ex:
+        parser.exit(1, '{}: error: {}\n'.format(parser.prog, ex))
+    except KeyboardInterrupt:
+        # Interrupting is the normal way to stop watching. Other commands
+        # were cut off, which must be visible to a pipeline.
+        if args.function is not _command_watch:
+            sys.exit(130)
+    except OSError as ex:
+        # The consumer of our output went away, e.g. `memaccess ... | head`.
+        # Windows reports this as EINVAL instead of EPIPE.
+        if ex.errno not in (errno.EPIPE, errno.EINVAL):
+            raise
+        # Redirect stdout, so flushing it on shutdown doesn't fail again.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
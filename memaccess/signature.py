@@ -0,0 +1,435 @@
+from collections import namedtuple
+import json
+import os
+import struct
+
+from memaccess import MemoryRegion
+
+
+_CHUNK_SIZE = 4 * 1024 * 1024
+
+
+ScanResult = namedtuple('ScanResult', ('matches', 'failed'))
+
+
+class Signature:
+    def __init__(self, pattern):
+        """
+        Compiles a byte signature.
+
+        A signature is a whitespace separated sequence of hexadecimal bytes.
+        Each nibble may be replaced by a `?` to match any value, so `??`
+        matches any byte and `4?` matches any byte from `0x40` to `0x4F`:
+
+        >>> from memaccess.signature import Signature
+        >>> signature = Signature('48 8B 05 ?? ?? ?? ?? 48 85 C0')
+        >>> list(signature.finditer(data))
+        [1520, 78242]
+
+        Searching anchors on the longest run of fixed bytes using
+        `bytes.find`, and only the remaining bytes are compared for each
+        candidate.
+
+        :param pattern:
+            The signature pattern to compile. It has to contain at least one
+            fixed byte.
+        """
+        tokens = pattern.split()
+        if not tokens:
+            raise ValueError('Empty signature')
+
+        values = bytearray()
+        masks = bytearray()
+        normalized_tokens = []
+        for token in tokens:
+            if token == '?':
+                token = '??'
+            token = token.upper()
+            if len(token) != 2:
+                raise ValueError('Invalid signature byte: {}'.format(token))
+
+            value = 0
+            mask = 0
+            for nibble in token:
+                value <<= 4
+                mask <<= 4
+                if nibble != '?':
+                    try:
+                        value |= int(nibble, 16)
+                    except ValueError:
+                        raise ValueError(
+                            'Invalid signature byte: {}'.format(token))
+                    mask |= 0xF
+            values.append(value)
+            masks.append(mask)
+            normalized_tokens.append(token)
+
+        self.pattern = ' '.join(normalized_tokens)
+        self.size = len(values)
+
+        # Split the signature into runs of fixed bytes and partially masked
+        # bytes.
+        runs = []
+        self._nibbles = []
+        run_start = None
+        for offset, (value, mask) in enumerate(zip(values, masks)):
+            if mask == 0xFF:
+                if run_start is None:
+                    run_start = offset
+                continue
+
+            if run_start is not None:
+                runs.append((run_start, bytes(values[run_start:offset])))
+                run_start = None
+            if mask:
+                self._nibbles.append((offset, value, mask))
+        if run_start is not None:
+            runs.append((run_start, bytes(values[run_start:])))
+
+        if not runs:
+            raise ValueError(
+                'Signature {} contains no fixed byte'.format(self.pattern))
+
+        anchor = max(runs, key=lambda run: len(run[1]))
+        runs.remove(anchor)
+        self._anchor_offset, self._anchor = anchor
+        self._literals = runs
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Creates a signature matching exactly the given bytes.
+
+        :param data:
+            The `bytes` to match.
+        :return:
+            A new `Signature`.
+        """
+        return cls(' '.join('{:02X}'.format(byte) for byte in data))
+
+    def finditer(self, data, stop=None):
+        """
+        Finds all occurrences of the signature.
+
+        :param data:
+            The `bytes` to search.
+        :param stop:
+            Only matches starting before this offset are yielded. Matches
+            have to lie completely inside `data` regardless.
+        :return:
+            An iterator of offsets where the signature matches.
+        """
+        last_start = len(data) - self.size + 1
+        if stop is not None:
+            last_start = min(last_start, stop)
+        if last_start <= 0:
+            return
+
+        anchor = self._anchor
+        anchor_offset = self._anchor_offset
+        literals = self._literals
+        nibbles = self._nibbles
+        find = data.find
+
+        # The anchor has to lie completely before `end` for a match to start
+        # before `last_start`.
+        end = last_start + anchor_offset + len(anchor) - 1
+        position = find(anchor, anchor_offset, end)
+        while position != -1:
+            start = position - anchor_offset
+            if (all(data[start + offset:start + offset + len(literal)] ==
+                    literal
+                    for offset, literal in literals) and
+                    all(data[start + offset] & mask == value
+                        for offset, value, mask in nibbles)):
+                yield start
+            position = find(anchor, position + 1, end)
+
+    def __eq__(self, other):
+        return (isinstance(other, Signature) and
+                self.pattern == other.pattern)
+
+    def __hash__(self):
+        return hash(self.pattern)
+
+    def __repr__(self):
+        return '{}({!r})'.format(type(self).__name__, self.pattern)
+
+
+def merge_regions(regions):
+    """
+    Merges adjacent memory regions.
+
+    Regions directly following each other are joined, so data crossing
+    region borders can be searched as a whole. The protection of a merged
+    region is `None` if the protections of its parts differ.
+
+    :param regions:
+        An iterable of `MemoryRegion` objects in ascending order.
+    :return:
+        An iterator of merged `MemoryRegion` objects.
+    """
+    merged = None
+    for region in regions:
+        if (merged is not None and
+                merged.address + merged.size == region.address):
+            merged = MemoryRegion(
+                address=merged.address,
+                size=merged.size + region.size,
+                protect=(merged.protect if merged.protect == region.protect
+                         else None))
+            continue
+
+        if merged is not None:
+            yield merged
+        merged = region
+
+    if merged is not None:
+        yield merged
+
+
+def scan(view, signatures, regions=None, chunk_size=_CHUNK_SIZE):
+    """
+    Searches process memory for multiple signatures at once.
+
+    Each region is read only once in chunks of `chunk_size` bytes, and all
+    signatures are searched inside each chunk. Adjacent regions are merged
+    and consecutive chunks overlap, so matches crossing region or chunk
+    borders are found as well. Chunks that can't be read (e.g. because the
+    process released the memory in the meantime) are skipped and reported in
+    the result.
+
+    >>> signature = Signature('48 8B 05 ?? ?? ?? ?? 48 85 C0')
+    >>> with MemoryView(5555) as view:
+    >>>     result = scan(view, [signature])
+    >>> result.matches[signature]
+    [5368713248, 5368782010]
+    >>> result.failed
+    []
+
+    :param view:
+        The `MemoryView` to read from.
+    :param signatures:
+        An iterable of `Signature` objects to search for.
+    :param regions:
+        An iterable of `MemoryRegion` objects to search. `None` searches all
+        readable regions of the process.
+    :param chunk_size:
+        Number of bytes to read at once.
+    :return:
+        A `ScanResult`. Its `matches` are a dict mapping each signature to a
+        list of matching addresses in ascending order, its `failed` entries
+        are a list of `(address, size)` tuples of memory that couldn't be
+        read.
+    """
+    signatures = list(signatures)
+    results = {signature: [] for signature in signatures}
+    failed = []
+    if not signatures:
+        return ScanResult(matches=results, failed=failed)
+
+    if regions is None:
+        regions = view.regions()
+
+    overlap = max(signature.size for signature in signatures) - 1
+
+    for region in merge_regions(regions):
+        for offset in range(0, region.size, chunk_size):
+            address = region.address + offset
+            size = min(chunk_size + overlap, region.size - offset)
+
+            try:
+                data = view.read(size, address)
+            except RuntimeError:
+                failed.append((address, size))
+                continue
+
+            for signature in signatures:
+                results[signature].extend(
+                    address + match
+                    for match in signature.finditer(data, chunk_size))
+
+    return ScanResult(matches=results, failed=failed)
+
+
+def scan_module(view, module, signatures, cache=None):
+    """
+    Searches the memory of a module for multiple signatures at once.
+
+    If a `SignatureCache` is given, results are looked up there first, and
+    only signatures missing in the cache are searched for. New results are
+    stored in the cache afterwards, but only if the whole module could be
+    read.
+
+    >>> cache = SignatureCache('signatures.json')
+    >>> with MemoryView(5555) as view:
+    >>>     module = next(module for module in view.modules()
+    >>>                   if module.name == 'target.exe')
+    >>>     result = scan_module(view, module, signatures, cache)
+
+    :param view:
+        The `MemoryView` to read from.
+    :param module:
+        The `Module` to search.
+    :param signatures:
+        An iterable of `Signature` objects to search for.
+    :param cache:
+        An optional `SignatureCache` holding results of previous scans.
+    :return:
+        A `ScanResult`, see `scan`.
+    """
+    results = {}
+    failed = []
+    missing = []
+    for signature in signatures:
+        offsets = None if cache is None else cache.get(module, signature)
+        if offsets is None:
+            missing.append(signature)
+        else:
+            results[signature] = [module.address + offset
+                                  for offset in offsets]
+
+    if missing:
+        regions = view.regions(module.address, module.address + module.size)
+        matches, failed = scan(view, missing, regions)
+        results.update(matches)
+
+        # Incomplete results must not be cached, they would be served for
+        # this module file forever.
+        if cache is not None and not failed:
+            for signature, addresses in matches.items():
+                cache.set(module, signature,
+                          [address - module.address for address in addresses])
+            cache.save()
+
+    return ScanResult(matches=results, failed=failed)
+
+
+def module_identity(path):
+    """
+    Identifies a module file.
+
+    The identity consists of the file size, its modification time and the
+    build-id of the executable, which is made of the timestamp and checksum
+    inside its PE header. Files that are no PE executable have no build-id.
+
+    :param path:
+        Path to the module file.
+    :return:
+        A list `[size, mtime, build_id]`, or `None` if the file doesn't
+        exist.
+    """
+    try:
+        stat = os.stat(path)
+        with open(path, 'rb') as fl:
+            header = fl.read(0x40)
+            build_id = None
+            if len(header) == 0x40 and header[:2] == b'MZ':
+                pe_offset = struct.unpack_from('<I', header, 0x3C)[0]
+                fl.seek(pe_offset)
+                pe_header = fl.read(0x5C)
+                if len(pe_header) == 0x5C and pe_header[:4] == b'PE\0\0':
+                    timestamp = struct.unpack_from('<I', pe_header, 0x08)[0]
+                    checksum = struct.unpack_from('<I', pe_header, 0x58)[0]
+                    build_id = '{:08x}{:08x}'.format(timestamp, checksum)
+    except OSError:
+        return None
+
+    return [stat.st_size, stat.st_mtime_ns, build_id]
+
+
+class SignatureCache:
+    def __init__(self, path):
+        """
+        Initializes a new `SignatureCache`.
+
+        A `SignatureCache` persists signature scan results as offsets relative
+        to the module base address in a JSON file. Results are kept per module
+        file and are invalidated as soon as the identity of the file (see
+        `module_identity`) changes, so repeated attaches to the same binary
+        don't need to scan again.
+
+        :param path:
+            Path of the JSON file to store the cache in. It's created on
+            `save` if it doesn't exist yet. Corrupt contents of the file are
+            treated like missing results.
+        """
+        self.path = path
+
+        try:
+            with open(path) as fl:
+                self._entries = json.load(fl)
+        except (FileNotFoundError, ValueError):
+            self._entries = {}
+
+        if not isinstance(self._entries, dict):
+            self._entries = {}
+
+    def _get_entry(self, module, identity):
+        # Returns the entry of the module if it's valid for the given identity.
+        # Malformed entries of a corrupt cache file are treated as missing.
+        entry = self._entries.get(module.path)
+        if (not isinstance(entry, dict) or
+                entry.get('identity') != identity or
+                not isinstance(entry.get('signatures'), dict)):
+            return None
+        return entry
+
+    def get(self, module, signature):
+        """
+        Looks up cached results.
+
+        :param module:
+            The `Module` the signature was searched in.
+        :param signature:
+            The `Signature` to look up.
+        :return:
+            A list of offsets relative to the module base address, or `None`
+            if no valid results are cached.
+        """
+        identity = module_identity(module.path)
+        if identity is None:
+            return None
+
+        entry = self._get_entry(module, identity)
+        if entry is None:
+            return None
+
+        offsets = entry['signatures'].get(signature.pattern)
+        if (not isinstance(offsets, list) or
+                not all(isinstance(offset, int) for offset in offsets)):
+            return None
+        return offsets
+
+    def set(self, module, signature, offsets):
+        """
+        Stores results in the cache.
+
+        Results of a module file with a different identity are discarded.
+
+        :param module:
+            The `Module` the signature was searched in.
+        :param signature:
+            The searched `Signature`.
+        :param offsets:
+            A list of offsets relative to the module base address.
+        """
+        identity = module_identity(module.path)
+        if identity is None:
+            return
+
+        entry = self._get_entry(module, identity)
+        if entry is None:
+            entry = {'identity': identity, 'signatures': {}}
+            self._entries[module.path] = entry
+
+        entry['signatures'][signature.pattern] = list(offsets)
+
+    def save(self):
+        """
+        Writes the cache to its file.
+        """
+        temporary_path = self.path + '.tmp'
+        with open(temporary_path, 'w') as fl:
+            json.dump(self._entries, fl)
+        os.replace(temporary_path, self.path)
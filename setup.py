@@ -16,4 +16,7 @@ setup(
     long_description=read_file('README.rst'),
     license='MIT',
     url='https://github.com/Makman2/memaccess',
+    entry_points={
+        'console_scripts': ['memaccess = memaccess.__main__:main'],
+    },
 )
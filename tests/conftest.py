@@ -0,0 +1,76 @@
+from collections import namedtuple
+import re
+from subprocess import PIPE, Popen
+
+import pytest
+from tests.native import build_native_testapp
+
+
+TestProcessValue = namedtuple('TestProcessValue', ('type', 'value', 'address'))
+TestProcessInfo = namedtuple('TestProcessInfo', ('pid', 'values'))
+
+
+def match_testprocess_values(lines):
+    rgx = r'(.+?): (.+) at ((?:0x)?[0-9A-Fa-f]+)'
+
+    for line in lines:
+        match = re.match(rgx, line)
+        yield TestProcessValue(type=match.group(1),
+                               value=match.group(2),
+                               address=int(match.group(3), 16))
+
+
+@pytest.fixture(scope='session')
+def read_test_process():
+    test_app_path = build_native_testapp('read-test-app')
+
+    test_process = Popen(test_app_path,
+                         universal_newlines=True, stdin=PIPE, stdout=PIPE)
+
+    lines = iter(test_process.stdout.readline,
+                 'Press ENTER to quit...\n')
+
+    yield TestProcessInfo(pid=test_process.pid,
+                          values=tuple(match_testprocess_values(lines)))
+
+    test_process.stdin.write('\n')
+    test_process.stdin.flush()
+
+    test_process.wait()
+
+
+@pytest.fixture
+def write_test_process():
+    it = _write_test_process_iterator()
+    yield it
+
+    # Complete the iterator and let the process iterator do cleanups.
+    for _ in it:
+        pass
+
+
+def _write_test_process_iterator():
+    test_app_path = build_native_testapp('write-test-app')
+
+    test_process = Popen(test_app_path,
+                         universal_newlines=True, stdin=PIPE, stdout=PIPE)
+
+    lines = iter(test_process.stdout.readline,
+                 'Press ENTER to continue...\n')
+
+    yield TestProcessInfo(pid=test_process.pid,
+                          values=tuple(match_testprocess_values(lines)))
+
+    test_process.stdin.write('\n')
+    test_process.stdin.flush()
+
+    lines = iter(test_process.stdout.readline,
+                 'Press ENTER to quit...\n')
+
+    yield TestProcessInfo(pid=test_process.pid,
+                          values=tuple(match_testprocess_values(lines)))
+
+    test_process.stdin.write('\n')
+    test_process.stdin.flush()
+
+    test_process.wait()
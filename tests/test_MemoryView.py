@@ -1,83 +1,8 @@
-from collections import namedtuple
-import re
-from subprocess import PIPE, Popen
-
 import pytest
-from tests.native import build_native_testapp
 
 from memaccess import MemoryView
 
 
-TestProcessValue = namedtuple('TestProcessValue', ('type', 'value', 'address'))
-TestProcessInfo = namedtuple('TestProcessInfo', ('pid', 'values'))
-
-
-def match_testprocess_values(lines):
-    rgx = r'(.+?): (.+) at ((?:0x)?[0-9A-Fa-f]+)'
-
-    for line in lines:
-        match = re.match(rgx, line)
-        yield TestProcessValue(type=match.group(1),
-                               value=match.group(2),
-                               address=int(match.group(3), 16))
-
-
-@pytest.fixture(scope='module')
-def read_test_process():
-    test_app_path = build_native_testapp('read-test-app')
-
-    test_process = Popen(test_app_path,
-                         universal_newlines=True, stdin=PIPE, stdout=PIPE)
-
-    lines = iter(test_process.stdout.readline,
-                 'Press ENTER to quit...\n')
-
-    yield TestProcessInfo(pid=test_process.pid,
-                          values=tuple(match_testprocess_values(lines)))
-
-    test_process.stdin.write('\n')
-    test_process.stdin.flush()
-
-    test_process.wait()
-
-
-@pytest.fixture
-def write_test_process():
-    it = _write_test_process_iterator()
-    yield it
-
-    # Complete the iterator and let the process iterator do cleanups.
-    for _ in it:
-        pass
-
-
-def _write_test_process_iterator():
-    test_app_path = build_native_testapp('write-test-app')
-
-    test_process = Popen(test_app_path,
-                         universal_newlines=True, stdin=PIPE, stdout=PIPE)
-
-    lines = iter(test_process.stdout.readline,
-                 'Press ENTER to continue...\n')
-
-    yield TestProcessInfo(pid=test_process.pid,
-                          values=tuple(match_testprocess_values(lines)))
-
-    test_process.stdin.write('\n')
-    test_process.stdin.flush()
-
-    lines = iter(test_process.stdout.readline,
-                 'Press ENTER to quit...\n')
-
-    yield TestProcessInfo(pid=test_process.pid,
-                          values=tuple(match_testprocess_values(lines)))
-
-    test_process.stdin.write('\n')
-    test_process.stdin.flush()
-
-    test_process.wait()
-
-
 def test_invalid_process():
     # Trying to use process 0 raises an error according to API specs.
     with pytest.raises(RuntimeError) as ex:
@@ -343,3 +268,23 @@ def test_write(write_test_process):
     assert field1.address == field2.address
     assert values2 != values1
     assert values2 == new_values
+
+
+def test_regions(read_test_process):
+    field = next(v for v in read_test_process.values
+                 if v.type == 'bytes')
+
+    with MemoryView(read_test_process.pid) as view:
+        regions = list(view.regions())
+
+    assert any(region.address <= field.address < region.address + region.size
+               for region in regions)
+
+
+def test_modules(read_test_process):
+    with MemoryView(read_test_process.pid) as view:
+        modules = view.modules()
+
+    assert any(module.name.lower() == 'read-test-app.exe'
+               for module in modules)
+    assert any(module.name.lower() == 'kernel32.dll' for module in modules)
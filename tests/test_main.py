@@ -0,0 +1,139 @@
+from binascii import hexlify
+import json
+
+import pytest
+
+from memaccess.__main__ import main
+
+
+def read_records(capsys):
+    out, _ = capsys.readouterr()
+    return [json.loads(line) for line in out.splitlines()]
+
+
+def test_regions(read_test_process, capsys):
+    field = next(v for v in read_test_process.values
+                 if v.type == 'bytes')
+
+    main(['regions', str(read_test_process.pid)])
+
+    assert any(
+        record['address'] <= field.address <
+        record['address'] + record['size']
+        for record in read_records(capsys))
+
+
+def test_read(read_test_process, capsys):
+    field = next(v for v in read_test_process.values
+                 if v.type == 'int')
+
+    main(['read', str(read_test_process.pid), hex(field.address),
+          '--type', 'int'])
+
+    assert read_records(capsys) == [{'address': field.address,
+                                     'value': int(field.value)}]
+
+
+def test_read_bytes(read_test_process, capsysbinary):
+    field = next(v for v in read_test_process.values
+                 if v.type == 'bytes')
+    values = bytes([int(num) for num in field.value.split()])
+
+    main(['read', str(read_test_process.pid), hex(field.address),
+          '--size', str(len(values)), '--format', 'raw'])
+
+    out, _ = capsysbinary.readouterr()
+    assert out == values
+
+
+def test_dump(read_test_process, capsys):
+    field = next(v for v in read_test_process.values
+                 if v.type == 'bytes')
+    values = bytes([int(num) for num in field.value.split()])
+
+    main(['dump', str(read_test_process.pid), '--start', hex(field.address),
+          '--stop', hex(field.address + len(values))])
+
+    assert read_records(capsys) == [{'address': field.address,
+                                     'data': hexlify(values).decode('ascii')}]
+
+
+def test_dump_raw(read_test_process, capsysbinary):
+    field = next(v for v in read_test_process.values
+                 if v.type == 'bytes')
+    values = bytes([int(num) for num in field.value.split()])
+
+    main(['dump', str(read_test_process.pid), '--start', hex(field.address),
+          '--stop', hex(field.address + len(values)), '--format', 'raw'])
+
+    out, _ = capsysbinary.readouterr()
+    assert out == values
+
+
+def test_dump_raw_without_stop(capsys):
+    with pytest.raises(SystemExit) as ex:
+        main(['dump', '0', '--format', 'raw'])
+
+    assert ex.value.code == 2
+    _, err = capsys.readouterr()
+    assert err.endswith('memaccess: error: --format raw requires --stop\n')
+
+
+@pytest.mark.parametrize('workers', ('1', '4'))
+def test_search(read_test_process, capsys, workers):
+    field = next(v for v in read_test_process.values
+                 if v.type == 'bytes')
+
+    main(['search', str(read_test_process.pid),
+          '--pattern', '0B 16 21 ?? 37 42 4D ?8 63', '--workers', workers,
+          '--stats'])
+
+    out, err = capsys.readouterr()
+    assert {'address': field.address} in [json.loads(line)
+                                          for line in out.splitlines()]
+    assert set(json.loads(err)) == {'bytes_read', 'reads', 'errors',
+                                    'seconds', 'throughput'}
+
+
+def test_watch(read_test_process, capsys):
+    field = next(v for v in read_test_process.values
+                 if v.type == 'short')
+
+    main(['watch', str(read_test_process.pid), hex(field.address),
+          '--type', 'short', '--count', '2', '--interval', '0.01'])
+
+    records = read_records(capsys)
+    assert len(records) == 2
+    assert all(record['value'] == int(field.value) for record in records)
+
+
+def test_invalid_process(capsys):
+    with pytest.raises(SystemExit) as ex:
+        main(['read', '0', '0x1000', '--type', 'int'])
+
+    assert ex.value.code == 1
+    _, err = capsys.readouterr()
+    assert err == ("memaccess: error: Can't open process with pid 0, "
+                   'error code 87\n')
+
+
+def test_search_invalid_value(capsys):
+    with pytest.raises(SystemExit) as ex:
+        main(['search', '0', '--value', '70000', '--type', 'short'])
+
+    assert ex.value.code == 2
+    _, err = capsys.readouterr()
+    assert err.endswith('memaccess: error: short format requires '
+                        '-32768 <= number <= 32767\n')
+
+
+@pytest.mark.parametrize('option', ('--chunk-size', '--workers'))
+@pytest.mark.parametrize('value', ('0', '-5'))
+def test_non_positive_option(capsys, option, value):
+    with pytest.raises(SystemExit) as ex:
+        main(['dump', '0', option, value])
+
+    assert ex.value.code == 2
+    _, err = capsys.readouterr()
+    assert err.endswith('error: argument {}: must be positive: {}\n'.format(
+        option, value))
@@ -0,0 +1,259 @@
+import json
+import struct
+
+import pytest
+
+from memaccess import MemoryRegion, Module
+from memaccess.signature import (merge_regions, module_identity, scan,
+                                 scan_module, Signature, SignatureCache)
+
+
+class FakeMemoryView:
+    def __init__(self, address, data):
+        self.address = address
+        self.data = data
+        self.reads = 0
+        self.failing_address = None
+
+    def read(self, size, address):
+        self.reads += 1
+        if address == self.failing_address:
+            raise RuntimeError('Read failed')
+        offset = address - self.address
+        return self.data[offset:offset + size]
+
+    def regions(self, start=0, stop=None):
+        start = max(start, self.address)
+        end = self.address + len(self.data)
+        if stop is not None:
+            end = min(end, stop)
+        yield MemoryRegion(address=start, size=end - start, protect=0x04)
+
+
+def make_pe_file(path, timestamp):
+    data = bytearray(0x200)
+    data[:2] = b'MZ'
+    struct.pack_into('<I', data, 0x3C, 0x80)
+    data[0x80:0x84] = b'PE\0\0'
+    struct.pack_into('<I', data, 0x88, timestamp)
+    path.write(bytes(data), 'wb')
+    return bytes(data)
+
+
+def test_signature_pattern():
+    assert Signature('48 8b ?? ? 4?').pattern == '48 8B ?? ?? 4?'
+    assert Signature('48 8B').size == 2
+    assert Signature.from_bytes(b'\x01\xab') == Signature('01 AB')
+
+
+def test_invalid_signature():
+    with pytest.raises(ValueError) as ex:
+        Signature('')
+    assert str(ex.value) == 'Empty signature'
+
+    with pytest.raises(ValueError) as ex:
+        Signature('48 XY')
+    assert str(ex.value) == 'Invalid signature byte: XY'
+
+    with pytest.raises(ValueError) as ex:
+        Signature('48 8B0')
+    assert str(ex.value) == 'Invalid signature byte: 8B0'
+
+    with pytest.raises(ValueError) as ex:
+        Signature('?? 4?')
+    assert str(ex.value) == 'Signature ?? 4? contains no fixed byte'
+
+
+def test_signature_finditer():
+    signature = Signature('48 8B 05 ?? ?? ?? ?? 48 85 C0')
+    match = bytes.fromhex('48 8B 05 11 22 33 44 48 85 C0')
+    data = b'\x00' * 5 + match + b'\x48\x8B\x05\x00\x48\x85\xC1' + match
+
+    assert list(signature.finditer(data)) == [5, 22]
+    assert list(signature.finditer(data, 22)) == [5]
+    assert list(signature.finditer(data[:-1])) == [5]
+
+
+def test_signature_finditer_nibbles():
+    signature = Signature('0? 10 ?F')
+    data = bytes.fromhex('01 10 1F 11 10 2F 0A 10 2E')
+
+    assert list(signature.finditer(data)) == [0]
+
+
+def test_scan():
+    data = bytes(range(256)) * 64
+    view = FakeMemoryView(0x10000, data)
+    signature1 = Signature('FE FF 00 01')
+    signature2 = Signature('10 ?1')
+
+    matches, failed = scan(view, [signature1, signature2], chunk_size=100)
+
+    assert matches[signature1] == [0x10000 + 254 + 256 * i for i in range(63)]
+    assert matches[signature2] == [0x10000 + 16 + 256 * i for i in range(64)]
+    assert failed == []
+    # Every chunk is read once for all signatures.
+    assert view.reads == (len(data) + 99) // 100
+
+
+def test_scan_failed_read():
+    data = bytes(range(256)) * 4
+    view = FakeMemoryView(0x10000, data)
+    view.failing_address = 0x10100
+    signature = Signature('10 11')
+
+    matches, failed = scan(view, [signature], chunk_size=0x100)
+
+    assert matches[signature] == [0x10010, 0x10210, 0x10310]
+    assert failed == [(0x10100, 0x101)]
+
+
+def test_module_identity(tmpdir):
+    path = tmpdir.join('module.dll')
+    make_pe_file(path, 0x12345678)
+
+    size, mtime, build_id = module_identity(str(path))
+    assert size == 0x200
+    assert build_id == '1234567800000000'
+
+    path.write(b'no executable', 'wb')
+    assert module_identity(str(path))[2] is None
+
+    assert module_identity(str(tmpdir.join('missing.dll'))) is None
+
+
+def test_scan_module_cache(tmpdir):
+    path = tmpdir.join('module.dll')
+    data = make_pe_file(path, 0x12345678)
+    module = Module(name='module.dll', path=str(path), address=0x400000,
+                    size=len(data))
+    signature = Signature('50 45 00 00')
+    cache_path = str(tmpdir.join('cache.json'))
+
+    view = FakeMemoryView(module.address, data)
+    result = scan_module(view, module, [signature],
+                         SignatureCache(cache_path))
+    assert result.matches == {signature: [0x400080]}
+    assert view.reads == 1
+
+    # Results are loaded from the cache without scanning.
+    view = FakeMemoryView(module.address, data)
+    result = scan_module(view, module, [signature],
+                         SignatureCache(cache_path))
+    assert result.matches == {signature: [0x400080]}
+    assert result.failed == []
+    assert view.reads == 0
+
+    # A rebuilt module invalidates the cache.
+    make_pe_file(path, 0x12345679)
+    view = FakeMemoryView(module.address, data)
+    scan_module(view, module, [signature], SignatureCache(cache_path))
+    assert view.reads == 1
+
+
+def test_scan_module_cache_reused(tmpdir):
+    path = tmpdir.join('module.dll')
+    data = make_pe_file(path, 0x12345678)
+    module = Module(name='module.dll', path=str(path), address=0x400000,
+                    size=len(data))
+    signature = Signature('50 45 00 00')
+    cache = SignatureCache(str(tmpdir.join('cache.json')))
+
+    view = FakeMemoryView(module.address, data)
+    scan_module(view, module, [signature], cache)
+    assert view.reads == 1
+
+    # A module rebuilt while the same cache is in use invalidates the cache.
+    data = make_pe_file(path, 0x12345679)
+    view = FakeMemoryView(module.address, data)
+    scan_module(view, module, [signature], cache)
+    assert view.reads == 1
+
+
+def test_scan_module_incomplete_not_cached(tmpdir):
+    path = tmpdir.join('module.dll')
+    data = make_pe_file(path, 0x12345678)
+    module = Module(name='module.dll', path=str(path), address=0x400000,
+                    size=len(data))
+    signature = Signature('50 45 00 00')
+    cache_path = str(tmpdir.join('cache.json'))
+
+    view = FakeMemoryView(module.address, data)
+    view.failing_address = module.address
+    result = scan_module(view, module, [signature],
+                         SignatureCache(cache_path))
+    assert result.matches == {signature: []}
+    assert result.failed == [(module.address, len(data))]
+
+    # The incomplete result wasn't cached, so the module is scanned again.
+    view = FakeMemoryView(module.address, data)
+    result = scan_module(view, module, [signature],
+                         SignatureCache(cache_path))
+    assert result.matches == {signature: [0x400080]}
+    assert view.reads == 1
+
+
+def test_scan_across_regions():
+    data = b'\x00' * 0x100 + b'\xAA\xBB\xCC\xDD' + b'\x00' * 0xFC
+    view = FakeMemoryView(0x10000, data)
+    view.regions = lambda start=0, stop=None: iter((
+        MemoryRegion(address=0x10000, size=0x102, protect=0x20),
+        MemoryRegion(address=0x10102, size=0xFE, protect=0x04)))
+    signature = Signature('AA BB CC DD')
+
+    matches, failed = scan(view, [signature])
+
+    assert matches[signature] == [0x10100]
+    assert view.reads == 1
+
+
+def test_merge_regions():
+    regions = [MemoryRegion(address=0x1000, size=0x1000, protect=0x04),
+               MemoryRegion(address=0x2000, size=0x1000, protect=0x04),
+               MemoryRegion(address=0x3000, size=0x1000, protect=0x20),
+               MemoryRegion(address=0x5000, size=0x1000, protect=0x04)]
+
+    assert list(merge_regions(regions)) == [
+        MemoryRegion(address=0x1000, size=0x3000, protect=None),
+        MemoryRegion(address=0x5000, size=0x1000, protect=0x04)]
+
+
+def test_signature_cache_corrupt_file(tmpdir):
+    path = tmpdir.join('module.dll')
+    make_pe_file(path, 0x12345678)
+    module = Module(name='module.dll', path=str(path), address=0x400000,
+                    size=0x200)
+    cache_path = tmpdir.join('cache.json')
+    cache_path.write('{"truncated')
+
+    cache = SignatureCache(str(cache_path))
+    assert cache.get(module, Signature('50 45 00 00')) is None
+
+    cache.set(module, Signature('50 45 00 00'), [0x80])
+    cache.save()
+    assert SignatureCache(str(cache_path)).get(
+        module, Signature('50 45 00 00')) == [0x80]
+
+
+@pytest.mark.parametrize('entry', (
+    [],
+    {'signatures': {'50 45 00 00': [0x80]}},
+    {'identity': None},
+    {'identity': None, 'signatures': []},
+    {'identity': None, 'signatures': {'50 45 00 00': 'invalid'}},
+))
+def test_signature_cache_malformed_entry(tmpdir, entry):
+    path = tmpdir.join('module.dll')
+    make_pe_file(path, 0x12345678)
+    module = Module(name='module.dll', path=str(path), address=0x400000,
+                    size=0x200)
+    if isinstance(entry, dict) and 'identity' in entry:
+        entry['identity'] = module_identity(str(path))
+    cache_path = tmpdir.join('cache.json')
+    cache_path.write(json.dumps({str(path): entry}))
+
+    cache = SignatureCache(str(cache_path))
+    assert cache.get(module, Signature('50 45 00 00')) is None
+
+    cache.set(module, Signature('50 45 00 00'), [0x80])
+    assert cache.get(module, Signature('50 45 00 00')) == [0x80]